@@ -3,6 +3,7 @@
 import tomllib
 import logging
 from pathlib import Path
+from types import MappingProxyType
 
 logger = logging.getLogger("sticker_factory.config_manager")
 
@@ -23,15 +24,15 @@ def load_config():
         return {}
 
 
-# Load config once at module import time
-CONFIG = load_config()
+# Load config once at module import time; exported as read-only views
+CONFIG = MappingProxyType(load_config())
 
 # Export commonly used settings
-APP_CONFIG = CONFIG.get("app", {})
-UI_CONFIG = CONFIG.get("ui", {})
-TABS_CONFIG = CONFIG.get("tabs", {})
-LOGGING_CONFIG = CONFIG.get("logging", {})
-FALLBACK_CONFIG = CONFIG.get("fallback", {})
+APP_CONFIG = MappingProxyType(CONFIG.get("app", {}))
+UI_CONFIG = MappingProxyType(CONFIG.get("ui", {}))
+TABS_CONFIG = MappingProxyType(CONFIG.get("tabs", {}))
+LOGGING_CONFIG = MappingProxyType(CONFIG.get("logging", {}))
+FALLBACK_CONFIG = MappingProxyType(CONFIG.get("fallback", {}))
 
 PRIVACY_MODE = APP_CONFIG.get("privacy_mode", True)
 ENABLE_COMFY = APP_CONFIG.get("enable_comfy", False)
@@ -45,4 +46,6 @@ ENABLE_STDOUT = LOGGING_CONFIG.get("stdout", True)
 STDOUT_LOG_LEVEL = LOGGING_CONFIG.get("stdout_level", "INFO")
 
 FALLBACK_LABEL_TYPE = FALLBACK_CONFIG.get("label_type", "62")
-FALLBACK_MODELS = FALLBACK_CONFIG.get("models", {})
\ No newline at end of file
+FALLBACK_MODELS = FALLBACK_CONFIG.get("models", {})
+# Model names for membership tests; works whether models is a list or a table
+FALLBACK_MODEL_KEYS = frozenset(str(model) for model in FALLBACK_MODELS)
\ No newline at end of file
@@ -2,7 +2,7 @@ import queue
 import threading
 import time
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional, Dict, Any
 import uuid
@@ -18,6 +18,8 @@ class PrintJob:
     error: Optional[str] = None
     created_at: datetime = None
     completed_at: datetime = None
+    started: threading.Event = field(default_factory=threading.Event, repr=False)  # Set once processing
+    done: threading.Event = field(default_factory=threading.Event, repr=False)  # Set once completed or failed
 
     def __post_init__(self):
         if self.created_at is None:
@@ -63,6 +65,16 @@ class PrintQueue:
         """Get the status of a specific job"""
         return self.jobs.get(job_id)
 
+    def wait_for(self, job_id: str, timeout: Optional[float] = None) -> Optional[PrintJob]:
+        """Block until a job completes or fails, or until timeout expires.
+
+        Returns the job either way; check its status to tell a timeout apart.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+
     def get_queue_status(self):
         """Get overall queue status"""
         with self.lock:
@@ -108,6 +120,7 @@ class PrintQueue:
                 with self.lock:
                     self.is_processing = True
                     job.status = "processing"
+                    job.started.set()
 
                 try:
                     # Import here to make it mockable in tests
@@ -117,7 +130,6 @@ class PrintQueue:
                     success, error = process_print_job(
                         job.image,
                         job.params["printer_info"],
-                        job.params["temp_file_path"],
                         rotate=job.params.get("rotate", 0),
                         dither=job.params.get("dither", False),
                         label_type=job.params.get("label_type", "102")
@@ -137,6 +149,7 @@ class PrintQueue:
 
                 finally:
                     self.is_processing = False
+                    job.done.set()
                     self.queue.task_done()
 
             except Exception as e:
@@ -1,7 +1,10 @@
 """Logging configuration for the Sticker Factory application."""
 
+import atexit
 import logging
 import logging.handlers
+import queue
+import sys
 
 from pathlib import Path
 
@@ -24,16 +27,28 @@ class ColoredFormatter(logging.Formatter):
     BOLD = '\033[1m'             # Bold
     BLUE = '\033[34m'           # Blue
     
+    def __init__(self, fmt=None, datefmt=None, *args, plain_fmt=None, **kwargs):
+        # Colors are only useful on a terminal; fall back to plain_fmt otherwise
+        self._tty = sys.stderr.isatty()
+        if not self._tty and plain_fmt is not None:
+            fmt = plain_fmt
+        super().__init__(fmt, datefmt, *args, **kwargs)
+        self._colored = {
+            level: f"{color}{self.BOLD}{level}{self.RESET}" for level, color in self.COLORS.items()
+        }
+
     def format(self, record):
-        # Add color to the level name
+        if not self._tty:
+            return super().format(record)
+        # Add color to the level name, restoring it for any other handler
         levelname = record.levelname
-        color = self.COLORS.get(levelname, self.RESET)
-        record.levelname = f"{color}{self.BOLD}{levelname}{self.RESET}"
-        return super().format(record)
+        record.levelname = self._colored.get(levelname) or f"{self.RESET}{self.BOLD}{levelname}{self.RESET}"
+        try:
+            return super().format(record)
+        finally:
+            record.levelname = levelname
 
-# Create logs directory if it doesn't exist
 logs_dir = Path(__file__).parent / "logs"
-logs_dir.mkdir(exist_ok=True)
 
 # Get or create logger
 logger = logging.getLogger("sticker_factory")
@@ -49,7 +64,8 @@ detailed_formatter = logging.Formatter(
 )
 
 colored_formatter = ColoredFormatter(
-    "%(levelname)-19s: \033[35m%(filename)-20s\033[0m.\033[95m%(funcName)-25s\033[0m>>> %(message)s"
+    "%(levelname)-19s: \033[35m%(filename)-20s\033[0m.\033[95m%(funcName)-25s\033[0m>>> %(message)s",
+    plain_fmt="%(levelname)-8s: %(filename)-20s.%(funcName)-25s>>> %(message)s",
 )
 
 # Console handler (if enabled in config)
@@ -61,6 +77,8 @@ if ENABLE_STDOUT:
 
 # File handler (if enabled in config)
 if ENABLE_FILE_LOGGING:
+    # Create logs directory only when something will be written to it
+    logs_dir.mkdir(exist_ok=True)
     log_file = logs_dir / "sticker_factory.log"
     file_handler = logging.handlers.RotatingFileHandler(
         log_file,
@@ -69,7 +87,15 @@ if ENABLE_FILE_LOGGING:
     )
     file_handler.setLevel(getattr(logging, FILE_LOG_LEVEL.upper(), logging.WARNING))
     file_handler.setFormatter(detailed_formatter)
-    logger.addHandler(file_handler)
+
+    # Hand records to a background listener so file I/O and rotation checks stay off the caller's thread
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setLevel(file_handler.level)
+    logger.addHandler(queue_handler)
+    file_listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    file_listener.start()
+    atexit.register(file_listener.stop)
 
 # Prevent propagation to root logger
 logger.propagate = False
@@ -1,31 +1,79 @@
 """Printer handling and detection utilities for the Sticker Factory."""
 
+import functools
+import itertools
 import logging
-import subprocess
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 import time
 import os
 from pathlib import Path
-from brother_ql.models import ModelsManager
-from brother_ql.backends import backend_factory
-from brother_ql import labels
-from brother_ql.raster import BrotherQLRaster
-from brother_ql.conversion import convert
-from brother_ql.backends.helpers import send
-import usb.core
+from types import SimpleNamespace
 from dataclasses import dataclass
 
 import streamlit as st
 from job_queue import print_queue
-from config_manager import PRIVACY_MODE, DEBUG_MODE, FALLBACK_LABEL_TYPE, FALLBACK_MODELS
+from config_manager import PRIVACY_MODE, DEBUG_MODE, FALLBACK_LABEL_TYPE, FALLBACK_MODEL_KEYS
 
 logger = logging.getLogger("sticker_factory.printer_utils")
 
+# Media widths (mm) reported by the printer mapped to label identifiers
+_LABEL_SIZES = {
+    12: "12", 29: "29", 38: "38", 50: "50", 54: "54",
+    62: "62", 102: "102", 103: "103", 104: "104"
+}
+
+# ESC i S: raster command requesting a 32-byte status packet
+_STATUS_REQUEST = b"\x1b\x69\x53"
+
+# Seconds to wait for a queued print job before giving up
+PRINT_JOB_TIMEOUT = 120
+
+# Virtual printer output, created once at import rather than per print job
+DEBUG_DIR = Path("debug")
+if DEBUG_MODE:
+    DEBUG_DIR.mkdir(exist_ok=True)
+
+# USB vendor ID of Brother Industries
+BROTHER_VID = 0x04f9
+
+
+@functools.lru_cache(maxsize=1)
+def _get_brother_ql():
+    """Import brother_ql and pyusb on first use and build the static lookup tables.
+
+    Deferred so that code paths which never talk to a printer don't pay for
+    loading brother_ql and libusb.
+    """
+    from brother_ql import labels
+    from brother_ql.backends import backend_factory
+    from brother_ql.backends.helpers import send
+    from brother_ql.conversion import convert
+    from brother_ql.models import ModelsManager
+    from brother_ql.raster import BrotherQLRaster
+    from brother_ql.reader import interpret_response
+    import usb.core
+
+    return SimpleNamespace(
+        backend_factory=backend_factory,
+        send=send,
+        convert=convert,
+        BrotherQLRaster=BrotherQLRaster,
+        interpret_response=interpret_response,
+        USBError=usb.core.USBError,
+        # Pixel widths keyed by label identifier
+        label_widths={label.identifier: label.dots_printable[0] for label in labels.ALL_LABELS},
+        # Brother model identifiers keyed by USB product ID
+        model_by_pid={m.product_id: m.identifier for m in ModelsManager().iter_elements()},
+    )
+
+# Process start epoch plus a counter keeps archived filenames unique under burst printing
+_START_EPOCH = int(time.time())
+_FILENAME_COUNTER = itertools.count()
+
 def safe_filename(text):
-    epoch_time = int(time.time())
-    return f"{epoch_time}_{text}.png"
+    return f"{_START_EPOCH}_{next(_FILENAME_COUNTER)}_{text}.png"
 
-@dataclass
+@dataclass(slots=True)
 class PrinterInfo:
     identifier: str
     backend: str
@@ -40,12 +88,6 @@ class PrinterInfo:
     label_size : str = "unknown"
     label_width: int = 0
     label_height: int = 0
-    
-    def __getitem__(self, item):
-        return getattr(self, item)
-    
-    def __setitem__(self, key, value):
-        setattr(self, key, value)
 
 
 def create_virtual_printer():
@@ -71,9 +113,10 @@ def create_virtual_printer():
 
 def find_and_parse_printer():
     logger.info("Searching for Brother QL printers...")
-    model_manager = ModelsManager()
+    brother_ql = _get_brother_ql()
     
     found_printers = []
+    detected_printers = []
     
     # Add virtual printer if debug mode is enabled
     if DEBUG_MODE:
@@ -84,13 +127,13 @@ def find_and_parse_printer():
     for backend_name in ["pyusb", "linux_kernel"]:
         try:
             logger.debug(f"Trying backend: {backend_name}")
-            backend = backend_factory(backend_name)
+            backend = brother_ql.backend_factory(backend_name)
             available_devices = backend["list_available_devices"]()
             logger.debug(f"Found {len(available_devices)} devices with {backend_name} backend")
             
-            for printer in available_devices:
-                logger.debug(f"Found device: {printer}")
-                identifier = printer["identifier"]
+            for device in available_devices:
+                logger.debug(f"Found device: {device}")
+                identifier = device["identifier"]
                 parts = identifier.split("/")
 
                 if len(parts) < 4:
@@ -106,18 +149,29 @@ def find_and_parse_printer():
                 except ValueError:
                     logger.warning(f"Invalid device info format: {device_info}")
                     continue
+
+                # Skip non-Brother devices before any status I/O
+                try:
+                    vendor_id_int = int(vendor_id, 16)
+                except ValueError:
+                    logger.warning(f"Invalid vendor ID format: {vendor_id}")
+                    continue
+                if vendor_id_int != BROTHER_VID:
+                    logger.debug(f"Skipping non-Brother device with vendor ID: {vendor_id}")
+                    continue
                 
                 try:
                     product_id_int = int(product_id, 16)
-                    for m in model_manager.iter_elements():
-                        if m.product_id == product_id_int:
-                            model = m.identifier
-                            break
-                    logger.debug(f"Matched printer model: {model}")
                 except ValueError:
                     logger.warning(f"Invalid product ID format: {product_id}")
                     continue
 
+                model = brother_ql.model_by_pid.get(product_id_int)
+                if model is None:
+                    logger.warning(f"Skipping device with unknown product ID: {product_id}")
+                    continue
+                logger.debug(f"Matched printer model: {model}")
+
                 printer_info = PrinterInfo(
                     identifier=identifier,
                     backend=backend_name,
@@ -128,112 +182,131 @@ def find_and_parse_printer():
                     serial_number=serial_number,
                 )
 
-                found_printers.append(printer_info)   
-                printer_info['name'] = f"{printer_info['model']} - {printer_info['serial_number'][-4:]}"
-                get_printer_status(printer_info)
-                logger.debug(f"Added printer: {printer_info}")
+                printer_info.name = f"{printer_info.model} - {printer_info.serial_number[-4:]}"
+                detected_printers.append(printer_info)
 
         except Exception as e:
             logger.error(f"Error with backend {backend_name}: {str(e)}")
             continue    
+
+    # Status queries are independent USB round-trips, so run them concurrently
+    if detected_printers:
+        with ThreadPoolExecutor(max_workers=len(detected_printers)) as executor:
+            list(executor.map(get_printer_status, detected_printers))
+        for printer_info in detected_printers:
+            logger.debug(f"Added printer: {printer_info}")
+        found_printers.extend(detected_printers)
     return found_printers
 
 
 def get_printer_status(printer):
-    printer['status'] = "unknown"
-    printer['label_type'] = "unknown"
-    printer['label_size'] = "unknown"
-    printer['label_width'] = 0
-    printer['label_height'] = 0
-    logger.debug(f"Checking if '{printer['model']}' is in FALLBACK_MODELS: {FALLBACK_MODELS}")
-    if str(printer['model']) in FALLBACK_MODELS:
-        printer['label_type'] = FALLBACK_LABEL_TYPE
-        printer['label_width'] = get_label_width(FALLBACK_LABEL_TYPE)
-        printer['label_height'] = 0
-        printer['status'] = "Waiting to receive"
-        logger.debug(f"Using fallback label type {printer['label_type']} for model {printer['model']}")
-    else:
+    printer.status = "unknown"
+    printer.label_type = "unknown"
+    printer.label_size = "unknown"
+    printer.label_width = 0
+    printer.label_height = 0
+    logger.debug(f"Checking if '{printer.model}' is in FALLBACK_MODEL_KEYS: {sorted(FALLBACK_MODEL_KEYS)}")
+    # Everything runs under one try: this is called from worker threads, so errors must not escape
+    try:
+        if printer.model in FALLBACK_MODEL_KEYS:
+            printer.label_type = FALLBACK_LABEL_TYPE
+            printer.label_width = get_label_width(FALLBACK_LABEL_TYPE)
+            printer.label_height = 0
+            printer.status = "Waiting to receive"
+            logger.debug(f"Using fallback label type {printer.label_type} for model {printer.model}")
+            return
+
+        logger.debug(f"Requesting status from {printer.identifier} via {printer.backend}")
+        result = _query_printer_status(printer)
+        logger.debug(f"Status response: {result}")
+
+        if result.get("errors"):
+            logger.warning(f"Printer reported errors: {result['errors']}")
+
+        printer.status = result["phase_type"]
+        logger.debug(f"Detected status: {printer.status}")
+        printer.label_size = f"{result['media_width']} x {result['media_length']} mm"
         try:
-            cmd = f"brother_ql -b pyusb --model {printer['model']} -p {printer['identifier']} status"
-            logger.debug(f"Running status command: {cmd}")
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=5)
-            
-            # Log the raw output for debugging
-            if result.stdout:
-                logger.debug(f"Status command stdout:\n{result.stdout}")
-            if result.stderr:
-                logger.warning(f"Status command stderr:\n{result.stderr}")
-            if result.returncode != 0:
-                logger.warning(f"Status command returned non-zero exit code: {result.returncode}")
-                
-            for line in result.stdout.splitlines():
-                if "Phase:" in line:
-                    printer['status'] = line.split("Phase:")[1].strip()
-                    logger.debug(f"Detected status: {printer['status']}")
-                if "Media size:" in line:
-                    printer['label_size'] = line.split("Media size:")[1].strip()
-                    size_str = line.split("Media size:")[1].strip().split('x')[0].strip()
-                    try:
-                        media_width_mm = int(size_str)
-                        label_sizes = {
-                            12: "12", 29: "29", 38: "38", 50: "50", 54: "54",
-                            62: "62", 102: "102", 103: "103", 104: "104"
-                        }
-                        if media_width_mm in label_sizes:
-                            label_type = label_sizes[media_width_mm]
-                            printer['label_type'] = label_type
-                            printer['label_width'] = get_label_width(label_type)
-                            printer['label_height'] = None
-                            logger.debug(f"Detected label type: {label_type} from width: {media_width_mm}mm")
-                    except Exception as e:
-                        logger.warning(f"Exception parsing media width: {str(e)}")
-            logger.info(f"Printer {printer['name']}: label type: {printer['label_type']}, status: {printer['status']}")
-
-        except subprocess.TimeoutExpired:
-            logger.error(f"Timeout getting status for printer {printer['name']} - USB might be busy")
-            printer['status'] = "timeout"
+            media_width_mm = int(result["media_width"])
+            if media_width_mm in _LABEL_SIZES:
+                label_type = _LABEL_SIZES[media_width_mm]
+                printer.label_type = label_type
+                printer.label_width = get_label_width(label_type)
+                printer.label_height = None
+                logger.debug(f"Detected label type: {label_type} from width: {media_width_mm}mm")
         except Exception as e:
-            logger.warning(f"Error getting status for printer {printer['name']}: {str(e)}")
-            printer['status'] = str(e)
+            logger.warning(f"Exception parsing media width: {str(e)}")
+        logger.info(f"Printer {printer.name}: label type: {printer.label_type}, status: {printer.status}")
+
+    except TimeoutError:
+        logger.error(f"Timeout getting status for printer {printer.name} - USB might be busy")
+        printer.status = "timeout"
+    except Exception as e:
+        logger.warning(f"Error getting status for printer {printer.name}: {str(e)}")
+        printer.status = str(e)
+
+def _query_printer_status(printer, timeout=5):
+    """Send a status request to the printer and return the parsed response."""
+    brother_ql = _get_brother_ql()
+    backend_class = brother_ql.backend_factory(printer.backend)["backend_class"]
+    try:
+        device = backend_class(printer.identifier)
+        try:
+            # The pyusb backend waits up to 15s per write by default; bound USB I/O by our timeout
+            device.write_timeout = device.read_timeout = int(timeout * 1000)
+            device.write(_STATUS_REQUEST)
+            data = b""
+            deadline = time.monotonic() + timeout
+            while len(data) < 32:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No status response from {printer.identifier}")
+                data += device.read() or b""
+            return brother_ql.interpret_response(data[:32])
+        finally:
+            device.dispose()
+    except brother_ql.USBError as e:
+        if e.errno == 110:  # Operation timed out
+            raise TimeoutError(f"USB timeout talking to {printer.identifier}") from e
+        raise
 
 def get_label_width(label_type):
     """Get the pixel width of a label type."""
-    label_definitions = labels.ALL_LABELS
-    for label in label_definitions:
-        if label.identifier == label_type:
-            width = label.dots_printable[0]
-            logger.debug(f"Label type {label_type} width: {width} dots")
-            return width
-    raise ValueError(f"Label type {label_type} not found in label definitions")
+    try:
+        width = _get_brother_ql().label_widths[label_type]
+    except KeyError:
+        raise ValueError(f"Label type {label_type} not found in label definitions") from None
+    logger.debug(f"Label type {label_type} width: {width} dots")
+    return width
 
 def print_image(image, printer_info, rotate=0, dither=False):
     """Queue a print job."""
-    temp_dir = tempfile.gettempdir()
-    os.makedirs(temp_dir, exist_ok=True)
-
-    with tempfile.NamedTemporaryFile(suffix=".png", delete=False, dir=temp_dir) as temp_file:
-        temp_file_path = temp_file.name
-        image.save(temp_file_path, "PNG")
-        logger.info(f"{temp_file_path} added to print queue for printer {printer_info['name']}")
-
-    logger.debug(f"Using label type: {printer_info['label_type']}")
+    logger.info(f"Image added to print queue for printer {printer_info.name}")
+    logger.debug(f"Using label type: {printer_info.label_type}")
 
     job_id = print_queue.add_job(
         image,
         rotate=rotate,
         dither=dither,
         printer_info=printer_info,
-        temp_file_path=temp_file_path,
-        label_type=printer_info["label_type"]
+        label_type=printer_info.label_type
     )
 
-    status = print_queue.get_job_status(job_id)
     status_container = st.empty()
-    
-    while status.status in ["pending", "processing"]:
-        status_container.info(f"Print job status: {status.status}")
-        time.sleep(0.5)
-        status = print_queue.get_job_status(job_id)
+    status_container.info("Print job status: pending")
+
+    deadline = time.monotonic() + PRINT_JOB_TIMEOUT
+    job = print_queue.get_job_status(job_id)
+    if job.started.wait(PRINT_JOB_TIMEOUT) and not job.done.is_set():
+        status_container.info("Print job status: processing")
+
+    status = print_queue.wait_for(job_id, timeout=max(0, deadline - time.monotonic()))
+    if status.status in ("pending", "processing"):
+        # The job stays queued, so tell the user it will still print rather than inviting a resend
+        status_container.warning(
+            f"Print job still {status.status} after {PRINT_JOB_TIMEOUT} seconds. "
+            "It stays in the queue and will print when the printer is free; no need to print it again."
+        )
+        return False
 
     if status.status == "completed":
         status_container.success("Print job completed successfully!")
@@ -242,7 +315,7 @@ def print_image(image, printer_info, rotate=0, dither=False):
         else:
             filename = safe_filename("Stikka-")
             file_path = os.path.join("labels", filename)
-            image.save(file_path, "PNG")
+            image.save(file_path, "PNG", optimize=False, compress_level=1)
             status_container.success(f"Sticker saved as {filename}")
         
         return True
@@ -251,22 +324,20 @@ def print_image(image, printer_info, rotate=0, dither=False):
         return False
 
 
-def process_print_job(image, printer_info, temp_file_path, rotate=0, dither=False, label_type="102"):
+def process_print_job(image, printer_info, rotate=0, dither=False, label_type="102"):
     """
     Process a single print job.
     Returns (success, error_message)
     """
+    brother_ql = _get_brother_ql()
 
     try:
         # If debug mode is enabled, use virtual printer (save to debug directory)
         if DEBUG_MODE:
-            debug_dir = Path("debug")
-            debug_dir.mkdir(exist_ok=True)
-            
             # Generate a filename with timestamp
             timestamp = int(time.time())
-            filename = f"{timestamp}_debug_print_{printer_info['name'].replace(' ', '_')}.png"
-            output_path = debug_dir / filename
+            filename = f"{timestamp}_debug_print_{printer_info.name.replace(' ', '_')}.png"
+            output_path = DEBUG_DIR / filename
             
             # Copy the image to debug directory
             image.save(output_path, "PNG")
@@ -276,19 +347,19 @@ def process_print_job(image, printer_info, temp_file_path, rotate=0, dither=Fals
             - Label type: {label_type}
             - Rotate: {rotate}
             - Dither: {dither}
-            - Model: {printer_info['model']}
+            - Model: {printer_info.model}
             - Output: {output_path}
             """)
             return True, None
         
         # Prepare the image for printing
-        qlr = BrotherQLRaster(printer_info["model"])
+        qlr = brother_ql.BrotherQLRaster(printer_info.model)
         
-        logger.debug(f"Printing {temp_file_path} on label type {label_type} on printer {printer_info['name']}")
+        logger.debug(f"Printing image on label type {label_type} on printer {printer_info.name}")
         
-        instructions = convert(
+        instructions = brother_ql.convert(
             qlr=qlr,
-            images=[temp_file_path],
+            images=[image],
             label=label_type,
             rotate=rotate,
             threshold=70,
@@ -306,15 +377,15 @@ def process_print_job(image, printer_info, temp_file_path, rotate=0, dither=Fals
         - Label type: {label_type}
         - Rotate: {rotate}
         - Dither: {dither}
-        - Model: {printer_info['model']}
-        - Backend: {printer_info['backend']}
-        - Identifier: {printer_info['identifier']}
+        - Model: {printer_info.model}
+        - Backend: {printer_info.backend}
+        - Identifier: {printer_info.identifier}
         """)
 
         # Try to print using Python API
-        success = send(
+        success = brother_ql.send(
             instructions=instructions,
-            printer_identifier=printer_info["identifier"],
+            printer_identifier=printer_info.identifier,
             backend_identifier="pyusb"
         )
         
@@ -323,7 +394,7 @@ def process_print_job(image, printer_info, temp_file_path, rotate=0, dither=Fals
 
         return True, None
 
-    except usb.core.USBError as e:
+    except brother_ql.USBError as e:
         # Treat timeout errors as successful since they often occur after print completion
         if e.errno == 110:  # Operation timed out
             logger.error("USB timeout occurred - this is normal and the print likely completed")
@@ -336,12 +407,3 @@ def process_print_job(image, printer_info, temp_file_path, rotate=0, dither=Fals
         error_msg = f"Unexpected error during printing: {str(e)}"
         logger.error(error_msg)
         return False, error_msg
-
-    finally:
-        # Clean up temporary file
-        try:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-                logger.debug(f"Temporary file {temp_file_path} deleted.")
-        except Exception as e:
-            logger.warning(f"Failed to delete temporary file {temp_file_path}: {str(e)}")
\ No newline at end of file
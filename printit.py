@@ -6,7 +6,6 @@ import time
 import hashlib
 import logging
 from pathlib import Path
-from brother_ql import labels
 
 # Initialize logging configuration (must be done first!)
 import logging_config
@@ -211,46 +210,46 @@ printers = get_cached_printers()
 available_printers = []
 logger.info(f"Found {len(printers)} printer(s) total")
 for p in printers:
-    logger.info(f"Checking printer: {p['name']}, Status: '{p['status']}', Label Type: '{p['label_type']}'")
+    logger.info(f"Checking printer: {p.name}, Status: '{p.status}', Label Type: '{p.label_type}'")
     # If status is unknown but it's a cached printer, we might want to allow it if it was previously working
-    if p['status'] == 'Waiting to receive' or (p['status'] == 'unknown' and p['label_type'] != 'unknown'):
-        if p['label_type'] != 'unknown':
-            available_printers.append(p['name'])
-            logger.info(f"✓ Printer {p['name']} is available")
+    if p.status == 'Waiting to receive' or (p.status == 'unknown' and p.label_type != 'unknown'):
+        if p.label_type != 'unknown':
+            available_printers.append(p.name)
+            logger.info(f"✓ Printer {p.name} is available")
         else:
-            logger.warning(f"✗ Printer {p['name']} excluded: label_type is 'unknown'")
+            logger.warning(f"✗ Printer {p.name} excluded: label_type is 'unknown'")
     else:
-        logger.warning(f"✗ Printer {p['name']} excluded: status is '{p['status']}' (expected 'Waiting to receive')")
+        logger.warning(f"✗ Printer {p.name} excluded: status is '{p.status}' (expected 'Waiting to receive')")
 
 logger.info(f"Total available printers: {len(available_printers)}")
 
 st.sidebar.subheader(":primary[Printer Selection]")
 printer = st.sidebar.radio("**Available Printer**", available_printers)
-selected_printer = next((p for p in printers if p["name"] == printer), None)
+selected_printer = next((p for p in printers if p.name == printer), None)
 
 if not selected_printer:
     st.error("❌ No available printers detected! Check connections, power and paper.")
     
     st.sidebar.subheader("Detected Printers")
     for p in printers:
-        status_color = "green" if p['status'] == 'Waiting to receive' else "red"
-        label_color = "green" if p['label_type'] != 'unknown' else "red"
-        st.sidebar.markdown(f":primary[**{p['name']}**]\n- Label Size: :{label_color}[{p['label_size']}]\n- Status:  :{status_color}[{p['status']}]")
+        status_color = "green" if p.status == 'Waiting to receive' else "red"
+        label_color = "green" if p.label_type != 'unknown' else "red"
+        st.sidebar.markdown(f":primary[**{p.name}**]\n- Label Size: :{label_color}[{p.label_size}]\n- Status:  :{status_color}[{p.status}]")
     #st.stop()   
 
 else:
-    # st.sidebar.markdown(f"- *Serial Number:* {selected_printer['serial_number']}\n- *Label Size:* {selected_printer['label_size']}\n - *Status:* {selected_printer['status']}")
-    label_type = selected_printer['label_type']
-    label_width = selected_printer['label_width']
+    # st.sidebar.markdown(f"- *Serial Number:* {selected_printer.serial_number}\n- *Label Size:* {selected_printer.label_size}\n - *Status:* {selected_printer.status}")
+    label_type = selected_printer.label_type
+    label_width = selected_printer.label_width
 
     st.sidebar.subheader(":primary[Detected Printers]")
     for p in printers: 
-        status_color = "green" if p['status'] == 'Waiting to receive' else "red"
-        label_color = "green" if p['label_type'] != 'unknown' else "red"
-        if p.name == selected_printer['name']:
-            st.sidebar.markdown(f":green[**{p['name']}**]\n- Label Size: :{label_color}[{p['label_size']}]\n- Status:  :{status_color}[{p['status']}]")
+        status_color = "green" if p.status == 'Waiting to receive' else "red"
+        label_color = "green" if p.label_type != 'unknown' else "red"
+        if p.name == selected_printer.name:
+            st.sidebar.markdown(f":green[**{p.name}**]\n- Label Size: :{label_color}[{p.label_size}]\n- Status:  :{status_color}[{p.status}]")
         else:     
-            st.sidebar.markdown(f":primary[**{p['name']}**]\n- Label Size: :{label_color}[{p['label_size']}]\n- Status:  :{status_color}[{p['status']}]")
+            st.sidebar.markdown(f":primary[**{p.name}**]\n- Label Size: :{label_color}[{p.label_size}]\n- Status:  :{status_color}[{p.status}]")
 
 
 
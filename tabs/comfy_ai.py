@@ -1,33 +1,34 @@
-"""Comfy AI tab content."""
+"""Comfy AI generation UI, rendered from the Text2image tab."""
 
 import logging
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
+import base64
+import functools
 import io
 import json
 import os
-import time
-import tomllib
+import queue
+import threading
+import uuid
+import websocket
 from pathlib import Path
 from PIL import Image
 from datetime import datetime
+from config_manager import CONFIG
 
 logger = logging.getLogger("sticker_factory.tabs.comfy_ai")
 
-# Load configuration directly from config.toml
-def _load_config():
-    """Load config.toml from the workspace root."""
-    config_path = Path(__file__).parent.parent / "config.toml"
-    try:
-        with open(config_path, "rb") as f:
-            return tomllib.load(f)
-    except (FileNotFoundError, Exception):
-        return {}
+COMFY_URL = CONFIG.get("comfy", {}).get("url", "http://localhost:8188")
+COMFY_POLL_INTERVAL = CONFIG.get("comfy", {}).get("poll_interval", 5)
+COMFY_MAX_POLL_ATTEMPTS = 10
 
-_CONFIG = _load_config()
-COMFY_URL = _CONFIG.get("comfy", {}).get("url", "http://localhost:8188")
-COMFY_POLL_INTERVAL = _CONFIG.get("comfy", {}).get("poll_interval", 5)
+# Generated images are kept here; created once at import rather than per rerun
+TEMP_DIR = "temp"
+os.makedirs(TEMP_DIR, exist_ok=True)
 
 # Get Comfy AI credentials from secrets
 def get_comfy_auth():
@@ -42,44 +43,96 @@ def get_comfy_auth():
     return None
 
 
+@functools.lru_cache(maxsize=1)
+def get_comfy_session():
+    """Return a shared keep-alive session for the Comfy AI API.
+
+    Created lazily so st.secrets is read on first use rather than at import.
+    """
+    session = requests.Session()
+    session.auth = get_comfy_auth()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=4,
+        max_retries=Retry(total=2, backoff_factor=0.2),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@functools.lru_cache(maxsize=1)
 def load_workflow_template():
-    """Load the Comfy AI workflow template from prompt-api.json."""
+    """Load the Comfy AI workflow template from prompt-api.json.
+
+    Returns a ``(workflow, node_index)`` tuple, where ``node_index`` holds the
+    IDs of the nodes updated per generation. The result is cached and shared
+    between reruns, so it must not be mutated.
+    """
     template_path = Path(__file__).parent.parent / "comfy-ai" / "prompt-api.json"
     try:
         with open(template_path, "r") as f:
-            return json.load(f)
+            workflow = json.load(f)
     except (FileNotFoundError, Exception) as e:
         logger.error(f"Error loading workflow template: {e}")
-        return None
+        return None, None
 
+    node_index = _index_workflow_nodes(workflow)
+    if node_index is None:
+        logger.error("Workflow template is missing a CLIPTextEncode or EmptyLatentImage node")
+        return None, None
+    return workflow, node_index
 
-def update_workflow_prompt(workflow, prompt, width, height):
-    """Update the workflow with a new prompt and dimensions."""
-    # Find the CLIPTextEncode node (usually node "6" based on the template)
-    for node_id, node_data in workflow.get("prompt", {}).items():
-        if node_data.get("class_type") == "CLIPTextEncode":
-            node_data["inputs"]["text"] = prompt
-            break
-    
-    # Find the EmptyLatentImage node (usually node "5" based on the template)
+
+def _index_workflow_nodes(workflow):
+    """Find the prompt text and latent image node IDs in a single pass."""
+    node_index = {}
     for node_id, node_data in workflow.get("prompt", {}).items():
-        if node_data.get("class_type") == "EmptyLatentImage":
-            node_data["inputs"]["width"] = width
-            node_data["inputs"]["height"] = height
-            break
-    
-    return workflow
+        class_type = node_data.get("class_type")
+        # Use the first node of each type, as before
+        if class_type == "CLIPTextEncode":
+            node_index.setdefault("text_node", node_id)
+        elif class_type == "EmptyLatentImage":
+            node_index.setdefault("latent_node", node_id)
+        if len(node_index) == 2:
+            return node_index
+    return None
+
+
+def update_workflow_prompt(workflow, node_index, prompt, width, height):
+    """Return a copy of the workflow with a new prompt and dimensions.
+
+    Only the two updated nodes are copied; every other node is shared with
+    ``workflow``, which is left untouched.
+    """
+    nodes = workflow["prompt"]
+    text_id = node_index["text_node"]
+    latent_id = node_index["latent_node"]
+    text_node = nodes[text_id]
+    latent_node = nodes[latent_id]
+    return {
+        **workflow,
+        "prompt": {
+            **nodes,
+            text_id: {**text_node, "inputs": {**text_node["inputs"], "text": prompt}},
+            latent_id: {**latent_node, "inputs": {**latent_node["inputs"], "width": width, "height": height}},
+        },
+    }
+
 
+def queue_prompt(workflow, client_id=None):
+    """Queue a prompt to Comfy AI API.
 
-def queue_prompt(workflow):
-    """Queue a prompt to Comfy AI API."""
+    Passing ``client_id`` makes the server route progress events for this
+    prompt to the websocket opened with the same ID.
+    """
+    if client_id:
+        workflow = {**workflow, "client_id": client_id}
     try:
-        auth = get_comfy_auth()
-        response = requests.post(
+        response = get_comfy_session().post(
             url=f"{COMFY_URL}/prompt",
             json=workflow,
             headers={"Content-Type": "application/json"},
-            auth=auth
         )
         response.raise_for_status()
         return response.json()
@@ -91,10 +144,10 @@ def queue_prompt(workflow):
 def get_image(filename, subfolder="", folder_type="output"):
     """Get an image from Comfy AI API."""
     try:
-        auth = get_comfy_auth()
         data = {"filename": filename, "subfolder": subfolder, "type": folder_type}
-        response = requests.get(f"{COMFY_URL}/view", params=data, auth=auth)
+        response = get_comfy_session().get(f"{COMFY_URL}/view", params=data)
         response.raise_for_status()
+        # Pillow needs a seekable file, so the body is buffered once in BytesIO
         return Image.open(io.BytesIO(response.content))
     except Exception as e:
         logger.error(f"Error getting image: {e}")
@@ -104,8 +157,7 @@ def get_image(filename, subfolder="", folder_type="output"):
 def get_history(prompt_id):
     """Get the history for a prompt ID."""
     try:
-        auth = get_comfy_auth()
-        response = requests.get(f"{COMFY_URL}/history/{prompt_id}", auth=auth)
+        response = get_comfy_session().get(f"{COMFY_URL}/history/{prompt_id}")
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -113,16 +165,77 @@ def get_history(prompt_id):
         return None
 
 
+def fetch_generated_image(prompt_id):
+    """Return the first output image of a finished prompt, or None if not ready."""
+    history = get_history(prompt_id)
+    if not history or prompt_id not in history:
+        return None
+
+    for node_output in history[prompt_id].get("outputs", {}).values():
+        images = node_output.get("images")
+        if images:
+            image_info = images[0]
+            return get_image(image_info["filename"], image_info.get("subfolder", ""))
+    return None
+
+
+def open_comfy_websocket(client_id):
+    """Open the Comfy AI websocket for ``client_id``, or return None if unavailable."""
+    try:
+        scheme, address = COMFY_URL.split("://", 1)
+        ws_url = f"{'wss' if scheme == 'https' else 'ws'}://{address.rstrip('/')}/ws?clientId={client_id}"
+        header = []
+        auth = get_comfy_auth()
+        if auth:
+            token = base64.b64encode(f"{auth.username}:{auth.password}".encode()).decode()
+            header.append(f"Authorization: Basic {token}")
+        return websocket.create_connection(
+            ws_url,
+            header=header,
+            timeout=COMFY_POLL_INTERVAL * COMFY_MAX_POLL_ATTEMPTS,
+        )
+    except Exception as e:
+        logger.warning(f"Could not open Comfy AI websocket, falling back to polling: {e}")
+        return None
+
+
+def watch_prompt_completion(ws, prompt_id, events):
+    """Put ``prompt_id`` on ``events`` once Comfy AI reports it finished.
+
+    Runs in a background thread and closes ``ws`` when done.
+    """
+    def _listen():
+        try:
+            while True:
+                message = ws.recv()
+                if not isinstance(message, str):
+                    # Binary frames carry preview images
+                    continue
+                message = json.loads(message)
+                data = message.get("data", {})
+                if data.get("prompt_id") != prompt_id:
+                    continue
+                finished = message["type"] == "executing" and data.get("node") is None
+                if finished or message["type"] == "execution_error":
+                    events.put(prompt_id)
+                    return
+        except Exception as e:
+            logger.warning(f"Comfy AI websocket closed before prompt {prompt_id} finished: {e}")
+        finally:
+            ws.close()
+
+    threading.Thread(target=_listen, daemon=True).start()
+
+
 def render(preper_image, print_image, printer_info):
-    """Render the Comfy AI tab."""
-    st.subheader("Comfy AI Image Generation")
+    """Render the Comfy AI generation UI inside the Text2image tab."""
     st.write("Generate images using Comfy AI workflow")
     
     if COMFY_URL == "http://localhost:8188":
         st.info(f"Using default Comfy AI URL: {COMFY_URL}. Configure comfy.url in config.toml for custom endpoint.")
     
     # Load workflow template
-    workflow_template = load_workflow_template()
+    workflow_template, node_index = load_workflow_template()
     if not workflow_template:
         st.error("Could not load Comfy AI workflow template. Please check comfy-ai/prompt-api.json")
         return
@@ -137,12 +250,6 @@ def render(preper_image, print_image, printer_info):
     with col2:
         height = st.number_input("Height", min_value=64, max_value=2048, value=464, step=64, key="comfy_height")
     
-    # Initialize polling state
-    if "comfy_poll_attempts" not in st.session_state:
-        st.session_state.comfy_poll_attempts = 0
-    if "comfy_poll_failed" not in st.session_state:
-        st.session_state.comfy_poll_failed = False
-    
     # Generate button
     if st.button("Generate Image", key="comfy_generate"):
         if not prompt:
@@ -150,107 +257,66 @@ def render(preper_image, print_image, printer_info):
         else:
             with st.spinner("Queuing prompt to Comfy AI..."):
                 # Update workflow with prompt and dimensions
-                workflow = update_workflow_prompt(workflow_template.copy(), prompt, width, height)
+                workflow = update_workflow_prompt(workflow_template, node_index, prompt, width, height)
                 
+                # Subscribe before queueing so no completion event is missed
+                client_id = uuid.uuid4().hex
+                ws = open_comfy_websocket(client_id)
+
                 # Queue the prompt
-                result = queue_prompt(workflow)
+                result = queue_prompt(workflow, client_id)
                 if result:
                     prompt_id = result.get("prompt_id")
+                    st.session_state.comfy_events = queue.Queue()
+                    if ws:
+                        watch_prompt_completion(ws, prompt_id, st.session_state.comfy_events)
                     st.session_state.comfy_prompt_id = prompt_id
                     st.session_state.comfy_generating = True
-                    st.session_state.comfy_poll_attempts = 0
-                    st.session_state.comfy_poll_failed = False
                     st.session_state.comfy_generated_image = None
                     st.success(f"Prompt queued! ID: {prompt_id}")
-                    st.rerun()
                 else:
+                    if ws:
+                        ws.close()
                     st.error("Failed to queue prompt. Check Comfy AI connection.")
     
-    # Poll for completed generation
+    # Wait for the generation within this run; only the status widget updates
     if "comfy_prompt_id" in st.session_state and st.session_state.comfy_generating:
         prompt_id = st.session_state.comfy_prompt_id
-        attempts = st.session_state.comfy_poll_attempts
-        max_attempts = 10
-        
-        if attempts < max_attempts and not st.session_state.comfy_poll_failed:
-            # Check if we need to wait before polling
-            current_time = time.time()
-            if "comfy_last_poll_time" not in st.session_state:
-                st.session_state.comfy_last_poll_time = current_time
-            
-            time_since_last_poll = current_time - st.session_state.comfy_last_poll_time
-            
-            if time_since_last_poll >= COMFY_POLL_INTERVAL or attempts == 0:
-                # Poll for status
-                st.session_state.comfy_poll_attempts += 1
-                st.session_state.comfy_last_poll_time = current_time
-                
-                with st.spinner(f"Checking workflow status... (Attempt {st.session_state.comfy_poll_attempts}/{max_attempts})"):
-                    history = get_history(prompt_id)
-                    
-                    if history and prompt_id in history:
-                        outputs = history[prompt_id].get("outputs", {})
-                        image_found = False
-                        
-                        for node_id, node_output in outputs.items():
-                            if "images" in node_output:
-                                images = node_output["images"]
-                                if images:
-                                    # Get the first image
-                                    image_info = images[0]
-                                    filename = image_info["filename"]
-                                    subfolder = image_info.get("subfolder", "")
-                                    
-                                    generated_image = get_image(filename, subfolder)
-                                    if generated_image:
-                                        st.session_state.comfy_generated_image = generated_image
-                                        st.session_state.comfy_generating = False
-                                        st.session_state.comfy_poll_attempts = 0
-                                        image_found = True
-                                        st.success("Image generated successfully!")
-                                        break
-                        
-                        if not image_found:
-                            # Still processing, schedule next poll
-                            st.info(f"Workflow still processing... Next check in {COMFY_POLL_INTERVAL} seconds (Attempt {st.session_state.comfy_poll_attempts}/{max_attempts})")
-                            # Use a short delay before rerun to avoid tight loop
-                            time.sleep(0.5)
-                            st.rerun()
-                    else:
-                        # History not found yet, schedule next poll
-                        st.info(f"Waiting for workflow to start... Next check in {COMFY_POLL_INTERVAL} seconds (Attempt {st.session_state.comfy_poll_attempts}/{max_attempts})")
-                        # Use a short delay before rerun to avoid tight loop
-                        time.sleep(0.5)
-                        st.rerun()
+        max_attempts = COMFY_MAX_POLL_ATTEMPTS
+
+        with st.status("Generating image...", expanded=True) as status:
+            for attempt in range(1, max_attempts + 1):
+                status.update(label=f"Checking workflow status... (Attempt {attempt}/{max_attempts})")
+                generated_image = fetch_generated_image(prompt_id)
+                if generated_image:
+                    st.session_state.comfy_generated_image = generated_image
+                    status.update(label="Image generated successfully!", state="complete", expanded=False)
+                    break
+                if attempt < max_attempts:
+                    # Wake as soon as the websocket reports completion, or after one poll interval
+                    try:
+                        st.session_state.comfy_events.get(timeout=COMFY_POLL_INTERVAL)
+                    except queue.Empty:
+                        pass
             else:
-                # Wait until poll interval has passed - show status and rerun quickly
-                remaining_time = COMFY_POLL_INTERVAL - time_since_last_poll
-                st.info(f"Waiting... Next check in {remaining_time:.1f} seconds (Attempt {attempts + 1}/{max_attempts})")
-                # Use a short delay before rerun to avoid tight loop
-                time.sleep(0.5)
-                st.rerun()
-        elif attempts >= max_attempts:
-            # Max attempts reached, show error
-            if not st.session_state.comfy_poll_failed:
-                st.session_state.comfy_poll_failed = True
-                st.session_state.comfy_generating = False
                 total_time = max_attempts * COMFY_POLL_INTERVAL
+                status.update(label="Workflow did not complete", state="error")
                 st.error(f"❌ Workflow did not complete after {max_attempts} attempts ({total_time} seconds). The workflow may have failed or is taking longer than expected.")
                 logger.error(f"Comfy AI workflow {prompt_id} did not complete after {max_attempts} polling attempts")
+
+        st.session_state.comfy_generating = False
     
     # Display generated image
     if "comfy_generated_image" in st.session_state and st.session_state.comfy_generated_image:
         generated_image = st.session_state.comfy_generated_image
         
         # Save image to temp directory
-        temp_dir = "temp"
-        os.makedirs(temp_dir, exist_ok=True)
         current_date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = os.path.join(temp_dir, f"comfy_{current_date}.png")
+        filename = os.path.join(TEMP_DIR, f"comfy_{current_date}.png")
         generated_image.save(filename)
         
         # Prepare images for printing
-        grayscale_image, dithered_image = preper_image(generated_image, label_width=printer_info['label_width'])
+        grayscale_image, dithered_image = preper_image(generated_image, label_width=printer_info.label_width)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -38,7 +38,7 @@ def render(preper_image,printer_info, print_image):
                 print(f"Fetched cat image URL: {image_url}")
                 # Download and process image
                 img = Image.open(BytesIO(requests.get(image_url).content)).convert('RGB')
-                grayscale_image, dithered_image = preper_image(img, label_width=printer_info['label_width'])
+                grayscale_image, dithered_image = preper_image(img, label_width=printer_info.label_width)
                 
                 # Store in session state
                 st.session_state.dog_image = grayscale_image
@@ -16,8 +16,8 @@ def render(printer_info, get_fonts, find_url, preper_image, print_image, img_con
     
     st.subheader(":printer: a label")
 
-    label_type = printer_info["label_type"]
-    label_width = printer_info["label_width"]
+    label_type = printer_info.label_type
+    label_width = printer_info.label_width
     # Helper functions
     def calculate_actual_image_height_with_empty_lines(text, font, line_spacing=10):
         draw = ImageDraw.Draw(Image.new("RGB", (1, 1), color="white"))
@@ -42,7 +42,7 @@ def render(preper_image, print_image,printer_info):
         image_path = st.session_state.selected_image_path
         try:
             image_to_process = Image.open(image_path).convert("RGB")
-            grayscale_image, dithered_image = preper_image(image_to_process, label_width=printer_info['label_width'])
+            grayscale_image, dithered_image = preper_image(image_to_process, label_width=printer_info.label_width)
             
             st.info(f"Image loaded from history: {os.path.basename(image_path)}")
             
@@ -125,7 +125,7 @@ def render(preper_image, print_image,printer_info):
             image_to_process = Image.open(uploaded_image).convert("RGB")
 
         if image_to_process:
-            grayscale_image, dithered_image = preper_image(image_to_process, label_width=printer_info['label_width'])
+            grayscale_image, dithered_image = preper_image(image_to_process, label_width=printer_info.label_width)
 
             # Paths to save the original and dithered images in the 'temp' directory with postfix
             original_image_path = os.path.join(
@@ -178,7 +178,7 @@ def render(preper_image, print_image,printer_info):
         if image_to_process:
             
             # Process the fetched image
-            grayscale_image, dithered_image = preper_image(image_to_process, label_width=printer_info['label_width'])
+            grayscale_image, dithered_image = preper_image(image_to_process, label_width=printer_info.label_width)
             
             # Create checkboxes for rotation and dithering
             col1, col2 = st.columns(2)
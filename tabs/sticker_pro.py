@@ -194,7 +194,7 @@ def render(print_image,printer_info, apply_threshold, add_border, apply_histogra
             
             # Apply target width resizing if specified
             if target_width_mm > 0:
-                image = resize_image_to_width(image, target_width_mm, printer_info['label_width'])
+                image = resize_image_to_width(image, target_width_mm, printer_info.label_width)
             
             if mirror_checkbox:
                 image = ImageOps.mirror(image)
@@ -222,7 +222,7 @@ def render(print_image,printer_info, apply_threshold, add_border, apply_histogra
             dithered_image = None
             if print_choice == "Original":
                 dither = st.checkbox("Dither - approximate grey tones with dithering", value=True, key="sticker_pro_dither")
-                grayscale_image, dithered_image = preper_image(image, label_width=printer_info['label_width'])
+                grayscale_image, dithered_image = preper_image(image, label_width=printer_info.label_width)
                 display_image = dithered_image if dither else grayscale_image
             else:  # Threshold
                 threshold_percent = st.slider("Threshold (%)", 0, 100, 50, key="sticker_pro_threshold")
@@ -38,7 +38,7 @@ def render(preper_image, print_image, printer_info, determine_tile_rows, split_i
     st.subheader(":printer: tiling mode")
     st.markdown("Upload an image to split it into 2 or 3 rows of labels based on aspect ratio.")
 
-    label_width = printer_info['label_width']
+    label_width = printer_info.label_width
     
     # Allow the user to upload an image or PDF
     uploaded_image = st.file_uploader(
@@ -14,7 +14,7 @@ def render(preper_image,printer_info, print_image):
         if picture is not None:
             # Convert and process image
             picture = Image.open(picture).convert("RGB")
-            grayscale_image, dithered_image = preper_image(picture, label_width=printer_info['label_width'])
+            grayscale_image, dithered_image = preper_image(picture, label_width=printer_info.label_width)
 
             # Display processed image
             st.image(dithered_image, caption="Resized and Dithered Image")